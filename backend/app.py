@@ -1,33 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, stream_with_context
 from flask_cors import CORS
-import json
+import hashlib
+import logging
+import multiprocessing
 import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import ijson
+import orjson
+import yt_dlp
+from diskcache import Cache
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-# --- Startup Diagnostics ---
-print("--- Backend Server Starting ---")
-google_creds = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
-gemini_key = os.environ.get("GOOGLE_API_KEY")
-
-if google_creds and "PASTE_YOUR" not in google_creds and os.path.exists(google_creds):
-    print("[OK] Google Application Credentials path is valid.")
-elif google_creds and "PASTE_YOUR" in google_creds:
-    print("[ERROR] Please open the .env file and replace the placeholder with your credentials path.")
-else:
-    print("[ERROR] GOOGLE_APPLICATION_CREDENTIALS is not set or the file path is invalid.")
-    
-if gemini_key and "PASTE_YOUR" not in gemini_key:
-    print("[OK] Google API Key (Gemini) is set.")
-elif gemini_key and "PASTE_YOUR" in gemini_key:
-    print("[ERROR] Please open the .env file and replace the placeholder with your Gemini API key.")
-else:
-    print("[ERROR] GOOGLE_API_KEY is not set.")
-print("-----------------------------")
-# -------------------------
-
 # Import agent modules
 import video_agent
 import text_agent
@@ -37,6 +28,102 @@ app = Flask(__name__)
 # ... (rest of the file is unchanged)
 CORS(app)
 
+# Request bodies are tiny (a few URLs); reject anything larger with 413.
+app.config['MAX_CONTENT_LENGTH'] = 256 * 1024
+# Longer transcripts are cut at a sentence boundary before they are sent to Gemini.
+MAX_TRANSCRIPT_CHARS = 500000
+
+# Upper bound on videos processed concurrently across all batch/playlist requests.
+# The pool is shared so concurrent requests together stay within the Gemini/YouTube quota.
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "8"))
+_video_executor = None
+
+# Background jobs: requests sent with {"async": true} are queued here and polled
+# through /api/jobs/<job_id>, so the request thread is not held for the Gemini call.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_TTL_SECONDS = 3600
+_job_executor = None
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+# On-disk cache for generated notes, keyed by YouTube video id (transcripts are
+# cached by video_agent). Pass ?refresh=1 to bypass both and regenerate.
+CACHE_DIR = os.environ.get("NOTES_CACHE_DIR", ".cache")
+NOTES_CACHE_TTL = 30 * 86400
+_cache = None
+
+# One flat-extraction YoutubeDL reused for playlist listings. YoutubeDL is not
+# thread-safe, so calls are serialised with a lock.
+_ydl_flat = None
+_ydl_flat_lock = threading.Lock()
+
+# After YouTube rate-limits or blocks us, fail transcript fetches fast for a while
+# instead of hitting it again (which wastes a timeout and deepens the block).
+YOUTUBE_COOLDOWN_SECONDS = 300
+_youtube_blocked_until = 0.0
+# The error that started the cool-down (rate limit or IP block), repeated to callers.
+_youtube_block_error = None
+_youtube_block_lock = threading.Lock()
+
+# Very long transcripts are cleaned in a process pool so concurrent batch workers
+# don't serialise on the GIL; short ones aren't worth the pickling round trip.
+PROCESS_CLEAN_MIN_CHARS = 200000
+_clean_pool = None
+_clean_pool_lock = threading.Lock()
+
+# Markdown code fence wrapped around the whole response, e.g. ```json ... ```
+_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+def _startup():
+    """Configure logging, print the startup diagnostics and create the shared
+    executors, notes cache and playlist YoutubeDL."""
+    global _video_executor, _job_executor, _cache, _ydl_flat
+    # video_agent logs through the logging module; LOG_LEVEL=DEBUG shows per-track detail
+    logging.basicConfig(
+        level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+        format="%(levelname)s %(name)s: %(message)s",
+    )
+
+    # --- Startup Diagnostics ---
+    print("--- Backend Server Starting ---")
+    google_creds = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    gemini_key = os.environ.get("GOOGLE_API_KEY")
+
+    if google_creds and "PASTE_YOUR" not in google_creds and os.path.exists(google_creds):
+        print("[OK] Google Application Credentials path is valid.")
+    elif google_creds and "PASTE_YOUR" in google_creds:
+        print("[ERROR] Please open the .env file and replace the placeholder with your credentials path.")
+    else:
+        print("[ERROR] GOOGLE_APPLICATION_CREDENTIALS is not set or the file path is invalid.")
+
+    if gemini_key and "PASTE_YOUR" not in gemini_key:
+        print("[OK] Google API Key (Gemini) is set.")
+    elif gemini_key and "PASTE_YOUR" in gemini_key:
+        print("[ERROR] Please open the .env file and replace the placeholder with your Gemini API key.")
+    else:
+        print("[ERROR] GOOGLE_API_KEY is not set.")
+    print("-----------------------------")
+    # -------------------------
+
+    _video_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="notes-video")
+    _job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="notes-job")
+    _cache = Cache(CACHE_DIR, size_limit=2**32)
+    _ydl_flat = yt_dlp.YoutubeDL({'quiet': True, 'extract_flat': True, 'skip_download': True})
+
+
+# The spawn-based cleaning pool re-imports this file as __mp_main__ in every worker.
+# Workers only run text_agent.clean_transcript, so they skip the server setup.
+if __name__ != '__mp_main__':
+    _startup()
+
+
+def json_response(payload, status_code=200, headers=None):
+    """Serialize ``payload`` with orjson; a faster drop-in for ``jsonify``."""
+    return app.response_class(
+        orjson.dumps(payload), status=status_code, headers=headers, mimetype='application/json'
+    )
+
 
 def is_transcript_error(transcript):
     """Return True when the transcript is an error string."""
@@ -45,6 +132,11 @@ def is_transcript_error(transcript):
     return transcript.strip().lower().startswith("error:")
 
 
+def is_rate_limit_error(message):
+    """Return True when YouTube refused the request (rate limit or IP block)."""
+    return message in (video_agent.RATE_LIMIT_ERROR, video_agent.IP_BLOCKED_ERROR)
+
+
 def extract_transcript_metadata(video_url, result):
     if isinstance(result, tuple) and len(result) == 2:
         transcript, metadata = result
@@ -62,165 +154,322 @@ def extract_transcript_metadata(video_url, result):
     return transcript, metadata
 
 
-@app.route('/api/process-video', methods=['POST'])
-def process_video():
-    data = request.get_json()
-    video_url = data.get('video_url')
+def youtube_retry_after():
+    """Seconds left in the YouTube cool-down, or 0 when requests may go through."""
+    with _youtube_block_lock:
+        return max(0, int(_youtube_blocked_until - time.time() + 0.5))
 
-    if not video_url:
-        return jsonify({'error': 'Video URL is required'}), 400
 
-    # 1. Video_Agent: Get transcript (and metadata)
-    transcript_result = video_agent.get_transcript(video_url)
+def youtube_block_error():
+    """The error that started the current cool-down, so IP blocks keep their proxy/cookie hint."""
+    with _youtube_block_lock:
+        return _youtube_block_error or video_agent.RATE_LIMIT_ERROR
+
+
+def _start_youtube_cooldown(error):
+    global _youtube_blocked_until, _youtube_block_error
+    with _youtube_block_lock:
+        _youtube_blocked_until = time.time() + YOUTUBE_COOLDOWN_SECONDS
+        _youtube_block_error = error
+
+
+def fill_missing_metadata(metadata, values):
+    """Copy truthy ``values`` into ``metadata`` fields that are still empty.
+
+    ``dict.setdefault`` is not enough: extract_transcript_metadata() pre-fills every
+    field with None.
+    """
+    for key, value in values.items():
+        if value and not metadata.get(key):
+            metadata[key] = value
+
+
+def fetch_transcript(video_url, refresh=False):
+    """Return ``(transcript, metadata, cache_hit)``, reusing a cached transcript when possible.
+
+    Cached transcripts are served during a YouTube cool-down; anything else fails fast
+    with the error that started it (``RATE_LIMIT_ERROR`` or ``IP_BLOCKED_ERROR``) until
+    it expires.
+    """
+    if not refresh:
+        cached = video_agent.get_cached_transcript(video_url)
+        if cached is not None:
+            transcript, metadata = extract_transcript_metadata(video_url, cached)
+            return transcript, metadata, True
+
+    if youtube_retry_after():
+        transcript, metadata = extract_transcript_metadata(video_url, youtube_block_error())
+        return transcript, metadata, False
+
+    transcript_result = video_agent.get_transcript(video_url, use_cache=False)
     transcript, metadata = extract_transcript_metadata(video_url, transcript_result)
+    if is_transcript_error(transcript) and is_rate_limit_error(transcript.strip()):
+        print(f"YouTube refused the request; skipping YouTube calls for {YOUTUBE_COOLDOWN_SECONDS}s.")
+        _start_youtube_cooldown(transcript.strip())
+    return transcript, metadata, False
+
+
+def _rate_limited_response(payload):
+    retry_after = youtube_retry_after()
+    return {**payload, 'retry_after': retry_after}, 429, {'Retry-After': str(retry_after)}
+
+
+def notes_cache_key(video_url, cleaned_transcript):
+    """Key generated notes on the video, the transcript content and the prompt version."""
+    video_id = video_agent.extract_video_id(video_url)
+    if not video_id:
+        return None
+    digest = hashlib.sha256(cleaned_transcript.encode('utf-8')).hexdigest()
+    return ('notes', video_id, digest, summarizer_agent.PROMPT_VERSION)
+
+
+def _prune_jobs(now):
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job['future'].done() and now - job['created_at'] > JOB_TTL_SECONDS
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def _dispatch(handler, data):
+    """Run a route handler inline, or queue it as a job when ``async`` is requested.
+
+    Handlers return ``(payload, status_code)`` and may append a dict of response headers.
+    """
+    data = data or {}
+    refresh = request.args.get('refresh') in ('1', 'true')
+    if not data.get('async'):
+        payload, status_code, *headers = handler(data, refresh)
+        return json_response(payload, status_code, headers[0] if headers else None)
+
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _jobs_lock:
+        _prune_jobs(now)
+        _jobs[job_id] = {'future': _job_executor.submit(handler, data, refresh), 'created_at': now}
+    return json_response({'job_id': job_id, 'status_url': f'/api/jobs/{job_id}'}, 202)
+
+
+def _get_clean_pool():
+    global _clean_pool
+    with _clean_pool_lock:
+        if _clean_pool is None:
+            # spawn, not fork: forking a process that already runs threads can deadlock.
+            _clean_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(), mp_context=multiprocessing.get_context('spawn')
+            )
+    return _clean_pool
+
+
+def clean_transcript(transcript):
+    """Clean a transcript, offloading very long ones to the process pool."""
+    global _clean_pool
+    if len(transcript) < PROCESS_CLEAN_MIN_CHARS:
+        return text_agent.clean_transcript(transcript)
+    pool = _get_clean_pool()
+    try:
+        return pool.submit(text_agent.clean_transcript, transcript).result()
+    except BrokenProcessPool as e:
+        # A worker died; a broken pool rejects every later task, so drop it (the next
+        # long transcript gets a fresh one) and clean this one inline.
+        print(f"Transcript cleaning pool broke ({e}); cleaning inline and recreating the pool.")
+        with _clean_pool_lock:
+            if _clean_pool is pool:
+                _clean_pool = None
+        pool.shutdown(wait=False)
+        return text_agent.clean_transcript(transcript)
+
+
+def _prepare_transcript(video_url, refresh=False, prefetched_meta=None, fallback_title="Unknown Video"):
+    """Fetch and clean a transcript.
+
+    Returns ``(cleaned_transcript, metadata, cache_hit, error_message)``; on failure
+    ``cleaned_transcript`` is None and ``error_message`` explains why.
+    """
+    # 1. Video_Agent: Get transcript (and metadata)
+    transcript, metadata, cache_hit = fetch_transcript(video_url, refresh)
     if not transcript or is_transcript_error(transcript):
-        if is_transcript_error(transcript):
-            error_message = transcript.strip()
-            if error_message in (video_agent.RATE_LIMIT_ERROR, video_agent.IP_BLOCKED_ERROR):
-                status_code = 429
-            else:
-                status_code = 500
-        else:
-            error_message = 'Failed to retrieve transcript. Check backend logs for details.'
-            status_code = 500
-        return jsonify({'error': error_message, 'metadata': metadata}), status_code
+        error_message = (
+            transcript.strip()
+            if is_transcript_error(transcript)
+            else 'Failed to retrieve transcript. Check backend logs for details.'
+        )
+        return None, metadata, cache_hit, error_message
 
     # 2. Text_Agent: Clean transcript
-    cleaned_transcript = text_agent.clean_transcript(transcript)
+    cleaned_transcript = clean_transcript(transcript)
+    # Only the cleaned copy is needed from here on; don't keep both alive through summarization.
+    del transcript
+    if len(cleaned_transcript) > MAX_TRANSCRIPT_CHARS:
+        print(f"Transcript for {video_url} has {len(cleaned_transcript)} chars; truncating to {MAX_TRANSCRIPT_CHARS}.")
+        cleaned_transcript = text_agent.truncate_transcript(cleaned_transcript, MAX_TRANSCRIPT_CHARS)
 
-    # 3. Summarizer_Agent: Generate notes
-    video_title = metadata.get('title')
-    if not video_title:
-        try:
-            from pytube import YouTube
-            yt = YouTube(video_url)
-            video_title = yt.title
-            metadata['title'] = metadata.get('title') or yt.title
-            metadata['channel'] = metadata.get('channel') or getattr(yt, 'author', None)
-            metadata['duration'] = metadata.get('duration') or video_agent.format_duration(getattr(yt, 'length', None))
-            metadata['url'] = metadata.get('url') or getattr(yt, 'watch_url', video_url)
-        except Exception:
-            video_title = "Unknown Video"
-
-    metadata['title'] = metadata.get('title') or video_title
-
-    notes_json_string = summarizer_agent.summarize_transcript(cleaned_transcript, metadata)
+    # get_transcript() already filled metadata from yt-dlp; callers may know more.
+    fill_missing_metadata(metadata, prefetched_meta or {})
+    fill_missing_metadata(metadata, {'title': fallback_title})
+
+    return cleaned_transcript, metadata, cache_hit, None
+
+
+def _parse_notes(notes_json_string):
+    """Parse the summarizer's JSON output, returning ``(notes, error_message)``."""
     if not notes_json_string:
-        return jsonify({'error': 'Failed to generate notes from summarizer agent.'}), 500
-        
-    # Clean the string to make it valid JSON
-    notes_json_string = notes_json_string.strip().replace('```json', '').replace('```', '')
+        return None, 'Failed to generate notes from summarizer agent.'
+
+    # The summarizer requests application/json, so fences are rare; only strip them
+    # from the ends (a ``` inside the notes, e.g. a code sample, must survive).
+    notes_json_string = notes_json_string.strip()
+    if notes_json_string.startswith('```'):
+        notes_json_string = _FENCE_RE.sub('', notes_json_string)
 
     try:
-        notes = json.loads(notes_json_string)
-    except json.JSONDecodeError:
-        return jsonify({'error': 'Failed to parse summary from AI. The response was not valid JSON.'}), 500
+        notes = orjson.loads(notes_json_string)
+    except orjson.JSONDecodeError:
+        return None, 'Failed to parse summary from AI. The response was not valid JSON.'
 
     # Check if the parsed notes contain an error from the agent
-    if isinstance(notes, dict):
-        if 'error' in notes:
-            return jsonify({'error': notes['error']}), 500
-        notes_metadata = notes.get('metadata')
-        if isinstance(notes_metadata, dict):
-            for key in ('title', 'channel', 'duration', 'duration_seconds', 'url'):
-                value = notes_metadata.get(key)
-                if value:
-                    metadata[key] = value
-
-    return jsonify({
-        'transcript': cleaned_transcript,
-        'notes': notes,
-        'metadata': metadata
-    })
+    if isinstance(notes, dict) and 'error' in notes:
+        return None, notes['error']
+    return notes, None
+
+
+def _merge_notes_metadata(notes, metadata):
+    if not isinstance(notes, dict):
+        return
+    notes_metadata = notes.get('metadata')
+    if isinstance(notes_metadata, dict):
+        for key in ('title', 'channel', 'duration', 'duration_seconds', 'url'):
+            value = notes_metadata.get(key)
+            if value:
+                metadata[key] = value
+
+
+def _process_single(video_url, prefetched_meta=None, fallback_title="Unknown Video", refresh=False):
+    """Run the transcript -> clean -> summarize pipeline for one video.
+
+    ``prefetched_meta`` holds metadata already known to the caller (e.g. from a
+    playlist listing) and fills fields the transcript lookup left empty.
+    Returns a ``(result, error)`` tuple where exactly one side is populated;
+    ``result['cache_hit']`` is True when both transcript and notes came from cache.
+    """
+    try:
+        cleaned_transcript, metadata, transcript_hit, error_message = _prepare_transcript(
+            video_url, refresh, prefetched_meta, fallback_title
+        )
+        if error_message:
+            return None, {'video_url': video_url, 'error': error_message, 'metadata': metadata}
+
+        # 3. Summarizer_Agent: Generate notes
+        cache_key = notes_cache_key(video_url, cleaned_transcript)
+        notes = _cache.get(cache_key) if cache_key and not refresh else None
+        notes_hit = notes is not None
+        if notes is None:
+            notes_json_string = summarizer_agent.summarize_transcript(cleaned_transcript, metadata)
+            notes, error_message = _parse_notes(notes_json_string)
+            if error_message:
+                return None, {'video_url': video_url, 'error': error_message, 'metadata': metadata}
+            if cache_key:
+                _cache.set(cache_key, notes, expire=NOTES_CACHE_TTL)
+
+        _merge_notes_metadata(notes, metadata)
+
+        return {
+            'video_url': video_url,
+            'video_title': metadata['title'],
+            'transcript': cleaned_transcript,
+            'notes': notes,
+            'metadata': metadata,
+            'cache_hit': transcript_hit and notes_hit
+        }, None
 
-@app.route('/api/process-batch', methods=['POST'])
-def process_batch():
-    data = request.get_json()
+    except Exception as e:
+        return None, {'video_url': video_url, 'error': str(e)}
+
+
+def _handle_process_video(data, refresh=False):
+    video_url = data.get('video_url')
+
+    if not video_url:
+        return {'error': 'Video URL is required'}, 400
+
+    if not isinstance(video_url, str) or not video_agent.is_valid_youtube_url(video_url):
+        return {'error': 'Invalid YouTube URL'}, 400
+
+    result, error = _process_single(video_url, refresh=refresh)
+    if error:
+        if is_rate_limit_error(error['error']):
+            return _rate_limited_response(error)
+        return error, 500
+
+    return {
+        'transcript': result['transcript'],
+        'notes': result['notes'],
+        'metadata': result['metadata']
+    }, 200, {'X-Cache': 'HIT' if result['cache_hit'] else 'MISS'}
+
+
+def _process_videos(video_urls, title_prefix="Video", refresh=False, prefetched_meta=None):
+    """Process videos concurrently, returning ``(results, errors)`` in input order.
+
+    ``prefetched_meta``, when given, is a list of metadata dicts aligned with ``video_urls``.
+
+    Transcript and Gemini calls are network-bound, so threads overlap the waits.
+    Videos from every request share ``_video_executor``, which caps total concurrency.
+    A rate-limit or IP-block error cancels the videos that have not started yet.
+    """
+    results = []
+    errors = []
+    futures = {
+        _video_executor.submit(
+            _process_single, video_url,
+            prefetched_meta[i] if prefetched_meta else None,
+            f"{title_prefix} {i+1}", refresh
+        ): i
+        for i, video_url in enumerate(video_urls)
+    }
+    for future in as_completed(futures):
+        if future.cancelled():
+            continue
+        result, error = future.result()
+        i = futures[future]
+        if result is not None:
+            result.pop('cache_hit', None)
+            results.append((i, result))
+            continue
+        errors.append((i, error))
+        if is_rate_limit_error(error.get('error')):
+            print("YouTube is refusing requests (rate limit or IP block); cancelling remaining videos.")
+            # Cancelling each future (rather than shutting the executor down) lets
+            # the workers still mark them done, so as_completed does not stall.
+            for pending in futures:
+                pending.cancel()
+
+    results.sort(key=lambda item: item[0])
+    errors.sort(key=lambda item: item[0])
+    return [result for _, result in results], [error for _, error in errors]
+
+
+def _handle_process_batch(data, refresh=False):
     video_urls = data.get('video_urls', [])
     
     if not video_urls or not isinstance(video_urls, list):
-        return jsonify({'error': 'Video URLs list is required'}), 400
+        return {'error': 'Video URLs list is required'}, 400
     
     if len(video_urls) > 10:  # Limit batch size
-        return jsonify({'error': 'Maximum 10 videos per batch'}), 400
+        return {'error': 'Maximum 10 videos per batch'}, 400
+
+    invalid_urls = [
+        url for url in video_urls
+        if not isinstance(url, str) or not video_agent.is_valid_youtube_url(url)
+    ]
+    if invalid_urls:
+        return {'error': 'Invalid YouTube URLs', 'invalid_urls': invalid_urls}, 400
     
-    results = []
-    errors = []
+    print(f"Processing batch of {len(video_urls)} videos")
+    results, errors = _process_videos(video_urls, refresh=refresh)
     
-    for i, video_url in enumerate(video_urls):
-        try:
-            print(f"Processing video {i+1}/{len(video_urls)}: {video_url}")
-
-            transcript_result = video_agent.get_transcript(video_url)
-            transcript, metadata = extract_transcript_metadata(video_url, transcript_result)
-            if not transcript or is_transcript_error(transcript):
-                error_message = (
-                    transcript.strip()
-                    if is_transcript_error(transcript)
-                    else 'Failed to retrieve transcript'
-                )
-                errors.append({'video_url': video_url, 'error': error_message, 'metadata': metadata})
-                if error_message in (video_agent.RATE_LIMIT_ERROR, video_agent.IP_BLOCKED_ERROR):
-                    break
-                continue
-
-            cleaned_transcript = text_agent.clean_transcript(transcript)
-
-            video_title = metadata.get('title')
-            if not video_title:
-                try:
-                    from pytube import YouTube
-                    yt = YouTube(video_url)
-                    video_title = yt.title
-                    metadata['title'] = metadata.get('title') or yt.title
-                    metadata['channel'] = metadata.get('channel') or getattr(yt, 'author', None)
-                    metadata['duration'] = metadata.get('duration') or video_agent.format_duration(getattr(yt, 'length', None))
-                    metadata['url'] = metadata.get('url') or getattr(yt, 'watch_url', video_url)
-                except Exception:
-                    video_title = f"Video {i+1}"
-
-            metadata['title'] = metadata.get('title') or video_title
-
-            metadata['title'] = metadata.get('title') or video_title
-            notes_json_string = summarizer_agent.summarize_transcript(cleaned_transcript, metadata)
-            if not notes_json_string:
-                errors.append({'video_url': video_url, 'error': 'Failed to generate notes', 'metadata': metadata})
-                continue
-
-            notes_json_string = notes_json_string.strip().replace('```json', '').replace('```', '')
-
-            try:
-                notes = json.loads(notes_json_string)
-                if isinstance(notes, dict):
-                    if 'error' in notes:
-                        errors.append({'video_url': video_url, 'error': notes['error'], 'metadata': metadata})
-                        continue
-                    notes_metadata = notes.get('metadata')
-                    if isinstance(notes_metadata, dict):
-                        for key in ('title', 'channel', 'duration', 'duration_seconds', 'url'):
-                            value = notes_metadata.get(key)
-                            if value:
-                                metadata[key] = value
-
-                video_title = metadata.get('title') or video_title
-
-                results.append({
-                    'video_url': video_url,
-                    'video_title': video_title,
-                    'transcript': cleaned_transcript,
-                    'notes': notes,
-                    'metadata': metadata
-                })
-
-            except json.JSONDecodeError:
-                errors.append({'video_url': video_url, 'error': 'Failed to parse AI response', 'metadata': metadata})
-                continue
-
-        except Exception as e:
-            errors.append({'video_url': video_url, 'error': str(e)})
-            continue
-    
-    return jsonify({
+    return {
         'results': results,
         'errors': errors,
         'summary': {
@@ -228,121 +477,57 @@ def process_batch():
             'successful': len(results),
             'failed': len(errors)
         }
-    })
+    }, 200
 
-@app.route('/api/process-playlist', methods=['POST'])
-def process_playlist():
-    data = request.get_json()
+
+def _handle_process_playlist(data, refresh=False):
     playlist_url = data.get('playlist_url')
     
     if not playlist_url:
-        return jsonify({'error': 'Playlist URL is required'}), 400
+        return {'error': 'Playlist URL is required'}, 400
+
+    if not isinstance(playlist_url, str) or not video_agent.is_valid_youtube_url(playlist_url):
+        return {'error': 'Invalid YouTube playlist URL'}, 400
+
+    if youtube_retry_after():
+        return _rate_limited_response({'error': youtube_block_error()})
     
     try:
-        import yt_dlp
-        
         # Extract video URLs from playlist
-        ydl_opts = {
-            'quiet': True,
-            'extract_flat': True,
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            playlist_info = ydl.extract_info(playlist_url, download=False)
+        with _ydl_flat_lock:
+            playlist_info = _ydl_flat.extract_info(playlist_url, download=False)
             
         if not playlist_info or 'entries' not in playlist_info:
-            return jsonify({'error': 'Failed to extract playlist information'}), 500
+            return {'error': 'Failed to extract playlist information'}, 500
             
+        # The flat listing already carries title/channel/duration for each entry.
         video_urls = []
+        entry_metadata = []
         for entry in playlist_info['entries']:
             if entry and 'url' in entry:
                 video_urls.append(entry['url'])
+                entry_metadata.append({
+                    'title': entry.get('title'),
+                    'channel': entry.get('uploader') or entry.get('channel'),
+                    'duration': video_agent.format_duration(entry.get('duration')),
+                    'duration_seconds': entry.get('duration'),
+                })
         
         if not video_urls:
-            return jsonify({'error': 'No videos found in playlist'}), 500
+            return {'error': 'No videos found in playlist'}, 500
             
         # Limit playlist size
         if len(video_urls) > 20:
             video_urls = video_urls[:20]
-            return jsonify({'error': f'Playlist too large. Processing first 20 videos out of {len(playlist_info["entries"])}'}), 400
+            return {'error': f'Playlist too large. Processing first 20 videos out of {len(playlist_info["entries"])}'}, 400
         
         # Process videos in batch
-        results = []
-        errors = []
+        print(f"Processing playlist of {len(video_urls)} videos")
+        results, errors = _process_videos(
+            video_urls, title_prefix="Playlist Video", refresh=refresh, prefetched_meta=entry_metadata
+        )
         
-        for i, video_url in enumerate(video_urls):
-            try:
-                print(f"Processing playlist video {i+1}/{len(video_urls)}: {video_url}")
-
-                transcript_result = video_agent.get_transcript(video_url)
-                transcript, metadata = extract_transcript_metadata(video_url, transcript_result)
-                if not transcript or is_transcript_error(transcript):
-                    error_message = (
-                        transcript.strip()
-                        if is_transcript_error(transcript)
-                        else 'Failed to retrieve transcript'
-                    )
-                    errors.append({'video_url': video_url, 'error': error_message, 'metadata': metadata})
-                    if error_message in (video_agent.RATE_LIMIT_ERROR, video_agent.IP_BLOCKED_ERROR):
-                        break
-                    continue
-
-                cleaned_transcript = text_agent.clean_transcript(transcript)
-
-                video_title = metadata.get('title')
-                if not video_title:
-                    try:
-                        from pytube import YouTube
-                        yt = YouTube(video_url)
-                        video_title = yt.title
-                        metadata['title'] = metadata.get('title') or yt.title
-                        metadata['channel'] = metadata.get('channel') or getattr(yt, 'author', None)
-                        metadata['duration'] = metadata.get('duration') or video_agent.format_duration(getattr(yt, 'length', None))
-                        metadata['url'] = metadata.get('url') or getattr(yt, 'watch_url', video_url)
-                    except Exception:
-                        video_title = f"Playlist Video {i+1}"
-
-                metadata['title'] = metadata.get('title') or video_title
-
-                notes_json_string = summarizer_agent.summarize_transcript(cleaned_transcript, metadata)
-                if not notes_json_string:
-                    errors.append({'video_url': video_url, 'error': 'Failed to generate notes', 'metadata': metadata})
-                    continue
-
-                notes_json_string = notes_json_string.strip().replace('```json', '').replace('```', '')
-
-                try:
-                    notes = json.loads(notes_json_string)
-                    if isinstance(notes, dict):
-                        if 'error' in notes:
-                            errors.append({'video_url': video_url, 'error': notes['error'], 'metadata': metadata})
-                            continue
-                        notes_metadata = notes.get('metadata')
-                        if isinstance(notes_metadata, dict):
-                            for key in ('title', 'channel', 'duration', 'duration_seconds', 'url'):
-                                value = notes_metadata.get(key)
-                                if value:
-                                    metadata[key] = value
-
-                    video_title = metadata.get('title') or video_title
-
-                    results.append({
-                        'video_url': video_url,
-                        'video_title': video_title,
-                        'transcript': cleaned_transcript,
-                        'notes': notes,
-                        'metadata': metadata
-                    })
-
-                except json.JSONDecodeError:
-                    errors.append({'video_url': video_url, 'error': 'Failed to parse AI response', 'metadata': metadata})
-                    continue
-
-            except Exception as e:
-                errors.append({'video_url': video_url, 'error': str(e)})
-                continue
-        
-        return jsonify({
+        return {
             'playlist_url': playlist_url,
             'playlist_title': playlist_info.get('title', 'Unknown Playlist'),
             'results': results,
@@ -352,10 +537,145 @@ def process_playlist():
                 'successful': len(results),
                 'failed': len(errors)
             }
-        })
+        }, 200
         
     except Exception as e:
-        return jsonify({'error': f'Failed to process playlist: {str(e)}'}), 500
+        return {'error': f'Failed to process playlist: {str(e)}'}, 500
+
+
+@app.route('/api/process-video', methods=['POST'])
+def process_video():
+    return _dispatch(_handle_process_video, request.get_json())
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {orjson.dumps(payload).decode()}\n\n"
+
+
+@app.route('/api/process-video-stream', methods=['GET', 'POST'])
+def process_video_stream():
+    """Stream notes for one video as Server-Sent Events.
+
+    Emits ``metadata`` once the transcript is ready, ``chunk`` events carrying raw
+    JSON text as Gemini generates it, a ``field`` event for each top-level notes field
+    as soon as it is fully parsed, then ``done`` with the parsed notes (or ``error``).
+    Accepts ``?video_url=`` so it can be consumed with a browser EventSource.
+    """
+    data = request.get_json(silent=True) or {}
+    video_url = request.args.get('video_url') or data.get('video_url')
+    refresh = request.args.get('refresh') in ('1', 'true')
+
+    if not video_url:
+        return json_response({'error': 'Video URL is required'}, 400)
+
+    if not isinstance(video_url, str) or not video_agent.is_valid_youtube_url(video_url):
+        return json_response({'error': 'Invalid YouTube URL'}, 400)
+
+    def generate():
+        # The 200 headers are already sent once this runs, so failures must become
+        # error events rather than exceptions that silently cut the stream.
+        try:
+            cleaned_transcript, metadata, _, error_message = _prepare_transcript(video_url, refresh)
+        except Exception as e:
+            yield _sse('error', {'error': str(e)})
+            return
+        if error_message:
+            yield _sse('error', {'error': error_message, 'metadata': metadata})
+            return
+        yield _sse('metadata', metadata)
+
+        try:
+            cache_key = notes_cache_key(video_url, cleaned_transcript)
+            notes = _cache.get(cache_key) if cache_key and not refresh else None
+        except Exception as e:
+            yield _sse('error', {'error': str(e), 'metadata': metadata})
+            return
+        if notes is None:
+            # Parse the JSON incrementally as chunks arrive: each top-level field is
+            # emitted as soon as it is complete and the raw text is never accumulated.
+            notes = {}
+            fields = ijson.sendable_list()
+            parser = ijson.kvitems_coro(fields, '', use_float=True)
+            try:
+                for text in summarizer_agent.stream_summary(cleaned_transcript, metadata):
+                    yield _sse('chunk', {'text': text})
+                    parser.send(text.encode('utf-8'))
+                    for key, value in fields:
+                        notes[key] = value
+                        yield _sse('field', {'key': key, 'value': value})
+                    del fields[:]
+                parser.close()
+            except ijson.JSONError:
+                yield _sse('error', {
+                    'error': 'Failed to parse summary from AI. The response was not valid JSON.',
+                    'metadata': metadata
+                })
+                return
+            except Exception as e:
+                yield _sse('error', {'error': f'Error from Gemini API: {e}', 'metadata': metadata})
+                return
+            for key, value in fields:
+                notes[key] = value
+                yield _sse('field', {'key': key, 'value': value})
+
+            if 'error' in notes:
+                yield _sse('error', {'error': notes['error'], 'metadata': metadata})
+                return
+            if cache_key:
+                try:
+                    _cache.set(cache_key, notes, expire=NOTES_CACHE_TTL)
+                except Exception as e:
+                    # The notes are complete; not caching them shouldn't fail the stream.
+                    print(f"Could not cache notes for {video_url}: {e}")
+
+        _merge_notes_metadata(notes, metadata)
+
+        yield _sse('done', {
+            'transcript': cleaned_transcript,
+            'notes': notes,
+            'metadata': metadata
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@app.route('/api/process-batch', methods=['POST'])
+def process_batch():
+    return _dispatch(_handle_process_batch, request.get_json())
+
+
+@app.route('/api/process-playlist', methods=['POST'])
+def process_playlist():
+    return _dispatch(_handle_process_playlist, request.get_json())
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        return json_response({'error': 'Unknown job id'}, 404)
+
+    future = job['future']
+    if not future.done():
+        return json_response({'job_id': job_id, 'status': 'running' if future.running() else 'pending'}, 200)
+
+    try:
+        payload, status_code = future.result()[:2]
+    except Exception as e:
+        return json_response({'job_id': job_id, 'status': 'failed', 'error': str(e)}, 200)
+
+    return json_response({
+        'job_id': job_id,
+        'status': 'done',
+        'status_code': status_code,
+        'result': payload
+    })
+
 
 if __name__ == '__main__':
     app.run(debug=True)
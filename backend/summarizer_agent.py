@@ -1,33 +1,152 @@
-import json
+import datetime
+import hashlib
+import itertools
 import os
+import threading
+import time
 
 import google.generativeai as genai
+import orjson
+from google.generativeai import caching
 
+# Bump whenever the prompt or schema below changes so cached notes are regenerated.
+PROMPT_VERSION = 1
 
-def summarize_transcript(transcript, metadata=None):
+# Gemini context caching: a transcript summarized more than once within the TTL is
+# uploaded once as cached content and referenced by name on later calls, instead of
+# resending (and paying full input price for) every transcript token.
+CONTEXT_CACHE_TTL = datetime.timedelta(hours=1)
+CONTEXT_CACHE_MIN_CHARS = 16000
+# (digest, model) -> (CachedContent, or None if creating it failed, expiry timestamp)
+_context_caches = {}
+# (digest, model) -> expiry timestamp of the first sighting
+_seen_transcripts = {}
+_context_lock = threading.Lock()
+
+
+def _transcript_parts(transcript):
+    """Delimit the transcript as separate content parts instead of copying it into the prompt."""
+    return ['TRANSCRIPT:\n"""', transcript, '"""']
+
+
+def _cached_model(model_name, transcript):
+    """Return a model bound to a cached copy of ``transcript``, or None to send it inline.
+
+    The first sighting of a transcript by a model is only remembered; the cache is
+    created when the same transcript comes back to that model, so one-off videos never
+    pay for cache storage. A failed creation is remembered for the TTL too, so models
+    without caching support or too-short transcripts aren't retried on every call.
     """
-    Generates detailed lecture notes from a transcript using the Gemini API.
+    if len(transcript) < CONTEXT_CACHE_MIN_CHARS:
+        return None
+
+    digest = hashlib.sha256(transcript.encode('utf-8')).hexdigest()
+    key = (digest, model_name)
+    now = time.time()
+    ttl_seconds = CONTEXT_CACHE_TTL.total_seconds()
+    with _context_lock:
+        entry = _context_caches.get(key)
+        if entry and entry[1] <= now:
+            entry = None
+        if entry is None and _seen_transcripts.get(key, 0) <= now:
+            for seen_key in [k for k, expires_at in _seen_transcripts.items() if expires_at <= now]:
+                del _seen_transcripts[seen_key]
+            for cache_key in [k for k, (_, expires_at) in _context_caches.items() if expires_at <= now]:
+                del _context_caches[cache_key]
+            _seen_transcripts[key] = now + ttl_seconds
+            return None
+    if entry is not None:
+        if entry[0] is None:
+            return None
+        # Built outside the lock from the stored CachedContent object; passing its
+        # name instead would cost a CachedContent.get round trip on every call.
+        return genai.GenerativeModel.from_cached_content(cached_content=entry[0])
+
+    try:
+        cached = caching.CachedContent.create(
+            model=model_name,
+            contents=[{"role": "user", "parts": [{"text": part} for part in _transcript_parts(transcript)]}],
+            ttl=CONTEXT_CACHE_TTL,
+        )
+    except Exception as e:
+        print(f"Could not create Gemini context cache with {model_name}: {e}")
+        with _context_lock:
+            _context_caches[key] = (None, now + ttl_seconds)
+        return None
+
+    with _context_lock:
+        # Expire our pointer a minute early so we never reference a deleted cache.
+        _context_caches[key] = (cached, now + ttl_seconds - 60)
+    return genai.GenerativeModel.from_cached_content(cached_content=cached)
+
+
+def _forget_cached_model(model_name, transcript):
+    digest = hashlib.sha256(transcript.encode('utf-8')).hexdigest()
+    with _context_lock:
+        _context_caches.pop((digest, model_name), None)
+
+
+CANDIDATE_MODELS = [
+    'models/gemini-2.5-flash',
+    'gemini-2.5-flash',
+    'models/gemini-1.5-flash',
+    'models/gemini-1.5-flash-latest',
+    'models/gemini-1.5-pro',
+    'models/gemini-pro',
+    'gemini-pro'
+]
+
+# The first model that answered is tried first on later calls, so accounts without
+# access to the preferred model stop paying a failed round trip on every request.
+_good_model = None
+_models = {}
+_model_lock = threading.Lock()
+_configured_key = None
+
+
+def _ensure_configured():
+    """Configure the Gemini client once per process; returns False when no API key is set.
+
+    The client is only reconfigured if GOOGLE_API_KEY changes; cached models are
+    dropped then, since each keeps the client (and key) it was created with.
     """
+    global _configured_key
     api_key = os.environ.get("GOOGLE_API_KEY")
     if not api_key:
-        return '{"error": "GOOGLE_API_KEY environment variable not set."}'
+        return False
+    if api_key != _configured_key:
+        with _model_lock:
+            if api_key != _configured_key:
+                genai.configure(api_key=api_key)
+                _models.clear()
+                _configured_key = api_key
+    return True
+
 
-    genai.configure(api_key=api_key)
+def _candidate_models():
+    with _model_lock:
+        good_model = _good_model
+    if good_model is None:
+        return CANDIDATE_MODELS
+    return [good_model] + [name for name in CANDIDATE_MODELS if name != good_model]
 
-    metadata = metadata or {}
-    metadata_json = json.dumps(metadata)
 
-    candidate_models = [
-        'models/gemini-2.5-flash',
-        'gemini-2.5-flash',
-        'models/gemini-1.5-flash',
-        'models/gemini-1.5-flash-latest',
-        'models/gemini-1.5-pro',
-        'models/gemini-pro',
-        'gemini-pro'
-    ]
+def _remember_good_model(model_name):
+    global _good_model
+    with _model_lock:
+        _good_model = model_name
 
-    prompt = f"""
+
+def _get_model(model_name):
+    with _model_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = _models[model_name] = genai.GenerativeModel(model_name)
+    return model
+
+
+# Static prompt body; only the metadata is substituted per call. Literal braces are doubled.
+_INSTRUCTIONS_TEMPLATE = """
     You are Summarizer_Agent. Convert the transcript into a comprehensive study report.
 
     REQUIREMENTS:
@@ -85,20 +204,56 @@ def summarize_transcript(transcript, metadata=None):
 
     PROVIDED METADATA:
     {metadata_json}
+    """
+
+
+def _build_instructions(metadata):
+    metadata_json = orjson.dumps(metadata or {}).decode()
+    return _INSTRUCTIONS_TEMPLATE.format_map({'metadata_json': metadata_json})
 
-    TRANSCRIPT:
-    \"\"\"{transcript}\"\"\"
+
+def _generate(model_name, transcript, instructions, stream=False):
+    """Call Gemini, referencing a cached transcript when one is available."""
+    generation_config = {"response_mime_type": "application/json"}
+    try:
+        cached_model = _cached_model(model_name, transcript)
+        if cached_model is not None:
+            response = cached_model.generate_content(
+                instructions, generation_config=generation_config, stream=stream
+            )
+            if not stream:
+                return response
+            # Streaming errors only surface while reading chunks, so pull the first
+            # one here where a stale cache can still fall back to the inline call.
+            chunks = iter(response)
+            first = next(chunks, None)
+            return chunks if first is None else itertools.chain([first], chunks)
+    except Exception as e:
+        print(f"Cached Gemini context failed with {model_name}, resending transcript: {e}")
+        _forget_cached_model(model_name, transcript)
+
+    return _get_model(model_name).generate_content(
+        [instructions, *_transcript_parts(transcript)],
+        generation_config=generation_config,
+        stream=stream,
+    )
+
+
+def summarize_transcript(transcript, metadata=None):
     """
+    Generates detailed lecture notes from a transcript using the Gemini API.
+    """
+    if not _ensure_configured():
+        return '{"error": "GOOGLE_API_KEY environment variable not set."}'
+
+    instructions = _build_instructions(metadata)
 
     last_error = None
-    for model_name in candidate_models:
+    for model_name in _candidate_models():
         try:
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(
-                prompt,
-                generation_config={"response_mime_type": "application/json"}
-            )
+            response = _generate(model_name, transcript, instructions)
             if response.text:
+                _remember_good_model(model_name)
                 return response.text
             last_error = ValueError("Empty response from Gemini")
         except Exception as e:
@@ -106,3 +261,38 @@ def summarize_transcript(transcript, metadata=None):
             print(f"Error in Summarizer_Agent with {model_name}: {e}")
             continue
     return f'{{"error": "Error from Gemini API: {str(last_error)}"}}'
+
+
+def stream_summary(transcript, metadata=None):
+    """
+    Yields the JSON study report in text chunks as Gemini generates it.
+
+    Falls back to the next candidate model only while nothing has been yielded yet;
+    an error after the first chunk is raised to the caller.
+    """
+    if not _ensure_configured():
+        yield '{"error": "GOOGLE_API_KEY environment variable not set."}'
+        return
+
+    instructions = _build_instructions(metadata)
+
+    last_error = None
+    for model_name in _candidate_models():
+        started = False
+        try:
+            for chunk in _generate(model_name, transcript, instructions, stream=True):
+                text = chunk.text
+                if text:
+                    started = True
+                    yield text
+            if started:
+                _remember_good_model(model_name)
+                return
+            last_error = ValueError("Empty response from Gemini")
+        except Exception as e:
+            if started:
+                raise
+            last_error = e
+            print(f"Error in Summarizer_Agent with {model_name}: {e}")
+            continue
+    yield f'{{"error": "Error from Gemini API: {str(last_error)}"}}'
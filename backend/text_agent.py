@@ -1,16 +1,39 @@
 import re
 
+# Bracketed or parenthesised noise such as [Music] or (applause).
+_NOISE = re.compile(r'\[[^\]]*\]|\([^)]*\)')
+# A sentence terminator, the whitespace after it and the first character of the next sentence.
+_SENT_START = re.compile(r'([.!?])\s+(\S)')
+
+
+def _capitalize_sentence_start(match):
+    return match.group(1) + ' ' + match.group(2).upper()
+
+
 def clean_transcript(transcript):
     """
     Cleans and preprocesses the transcript.
     """
-    # Remove timestamps and other noise
-    transcript = re.sub(r'\[.*?\]', '', transcript)
-    transcript = re.sub(r'\(.*?\)', '', transcript)
-
-    # Fix punctuation and sentence casing
+    # Remove timestamps and other noise; most caption tracks have none, so skip the scan
+    if '[' in transcript or '(' in transcript:
+        transcript = _NOISE.sub('', transcript)
     transcript = transcript.strip()
-    sentences = re.split('(?<=[.!?]) +', transcript)
-    cleaned_sentences = [s.capitalize() for s in sentences]
-    
-    return " ".join(cleaned_sentences)
+
+    # Fix sentence casing in a single pass without lowercasing the rest of the
+    # sentence (keeps "NASA", "Python"), normalising the gap between sentences
+    transcript = _SENT_START.sub(_capitalize_sentence_start, transcript)
+    return transcript[:1].upper() + transcript[1:]
+
+
+def truncate_transcript(transcript, max_chars):
+    """
+    Shortens the transcript to at most max_chars, ending on a sentence boundary when possible.
+    """
+    if len(transcript) <= max_chars:
+        return transcript
+    head = transcript[:max_chars]
+    cut = max(head.rfind('.'), head.rfind('!'), head.rfind('?'))
+    # Fall back to a word boundary if the last sentence end is too far back.
+    if cut < max_chars // 2:
+        return head.rsplit(' ', 1)[0]
+    return head[:cut + 1]
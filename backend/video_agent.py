@@ -1,15 +1,34 @@
+import copy
+import logging
 import os
 import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from http.cookiejar import MozillaCookieJar
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse, parse_qs
 
+import orjson
 import requests
 import yt_dlp
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from diskcache import Cache
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
 from youtube_transcript_api._errors import IpBlocked, RequestBlocked
 from youtube_transcript_api.proxies import GenericProxyConfig, InvalidProxyConfig
 
+try:
+    # Optional (pip install google-re2): linear-time matching for the patterns
+    # that scan whole caption files and transcripts.
+    import re2 as _re_engine
+except ImportError:
+    _re_engine = re
+
+logger = logging.getLogger(__name__)
+
 SUSPECT_PATTERNS = [
     "we're sorry",
     "unusual traffic",
@@ -17,6 +36,9 @@ SUSPECT_PATTERNS = [
     "client does not have permission",
     "captcha",
 ]
+_SUSPECT_RE = _re_engine.compile("(?i)" + "|".join(map(re.escape, SUSPECT_PATTERNS)))
+# Regex to validate YouTube URL
+_YT_URL_RE = re.compile(r'^(https?://)?(www\.)?(youtube\.com|youtu\.?be)/.+$')
 
 DEFAULT_USER_AGENT = os.environ.get(
     "YOUTUBE_USER_AGENT",
@@ -25,6 +47,58 @@ DEFAULT_USER_AGENT = os.environ.get(
     "Chrome/118.0.0.0 Safari/537.36",
 )
 COOKIE_ENV_VARS = ("YOUTUBE_COOKIES_FILE", "YT_COOKIES_FILE")
+CAPTION_LANGS = ('en', 'en-US', 'en-GB')
+# Captions are first looked up in the InnerTube player response (one POST), which is
+# much cheaper than yt-dlp's full extractor; yt-dlp stays as the fallback.
+INNERTUBE_PLAYER_URL = "https://www.youtube.com/youtubei/v1/player?prettyPrint=false"
+INNERTUBE_CLIENT = {"clientName": "WEB", "clientVersion": "2.20240101.00.00", "hl": "en"}
+# Caption formats we accept, best first: vtt_to_text handles VTT properly, while the
+# srv formats are XML it only approximates (tags dropped, entities left as-is).
+_EXT_PRIORITY = {'vtt': 0, 'srv1': 1, 'srv2': 2, 'srv3': 3}
+# Caption track URLs for one video are downloaded concurrently by this many threads.
+CAPTION_FETCH_WORKERS = 4
+# Caption files are streamed in chunks and cut off past this size.
+CAPTION_CHUNK_BYTES = 65536
+MAX_CAPTION_BYTES = 5 * 1024 * 1024
+# Caption (and InnerTube player) requests share at most this many connections. After a 429
+# no new download starts until Retry-After (or a backoff doubling up to the max) has
+# passed; cool-downs up to CAPTION_MAX_WAIT seconds are waited out and retried.
+CAPTION_MAX_CONCURRENCY = 4
+CAPTION_BACKOFF_START = 2
+CAPTION_BACKOFF_MAX = 60
+CAPTION_MAX_WAIT = 10
+CAPTION_429_RETRIES = 2
+# Inline VTT markup such as <c> or <00:00:01.000>; never spans a line.
+_VTT_TAG_RE = _re_engine.compile(r'<[^>\n]+>')
+
+# Persistent cache of transcripts and video metadata keyed by video id.
+# Set YT_CACHE_DISABLE=1 to always go to YouTube.
+TRANSCRIPT_CACHE_TTL = 7 * 86400
+METADATA_CACHE_TTL = 86400
+METADATA_CACHE_FIELDS = ("webpage_url", "original_url", "title", "uploader", "channel", "duration")
+CACHE_ENABLED = os.environ.get("YT_CACHE_DISABLE", "").lower() not in ("1", "true", "yes")
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache():
+    # Opened on first use so processes that merely import this module (e.g. the
+    # app's transcript-cleaning workers) don't open the cache directory.
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = Cache(os.environ.get("YT_CACHE_DIR", ".yt_cache"))
+    return _cache
+
+
+def _cache_get(key):
+    # Values are stored as orjson bytes rather than pickles; anything else is a stale entry.
+    raw = _get_cache().get(key)
+    return orjson.loads(raw) if isinstance(raw, bytes) else None
+
+
+def _cache_set(key, value, expire):
+    _get_cache().set(key, orjson.dumps(value), expire=expire)
 
 
 def format_duration(seconds: Optional[int]) -> Optional[str]:
@@ -44,14 +118,12 @@ def format_duration(seconds: Optional[int]) -> Optional[str]:
 
 
 def is_valid_youtube_url(url):
-    # Regex to validate YouTube URL
-    youtube_regex = r'^(https?://)?(www\.)?(youtube\.com|youtu\.?be)/.+$'
-    return re.match(youtube_regex, url) is not None
+    return _YT_URL_RE.match(url) is not None
 
 
 def is_suspect_content(text: str) -> bool:
-    lowered = text.lower()
-    return any(pattern in lowered for pattern in SUSPECT_PATTERNS)
+    # One case-insensitive scan instead of lowercasing a full transcript copy.
+    return _SUSPECT_RE.search(text) is not None
 
 RATE_LIMIT_ERROR = "Error: YouTube rate-limited the caption request. Please wait and try again."
 IP_BLOCKED_ERROR = (
@@ -59,6 +131,9 @@ IP_BLOCKED_ERROR = (
 )
 
 
+# Cookie and proxy settings are read from the environment once per process;
+# call clear_settings_cache() after changing them at runtime.
+@lru_cache(maxsize=1)
 def resolve_cookie_path() -> Optional[str]:
     for env_var in COOKIE_ENV_VARS:
         configured = os.environ.get(env_var)
@@ -67,10 +142,11 @@ def resolve_cookie_path() -> Optional[str]:
         expanded = os.path.expanduser(configured)
         if os.path.exists(expanded):
             return expanded
-        print(f"Cookie file specified in {env_var} not found: {expanded}")
+        logger.warning("Cookie file specified in %s not found: %s", env_var, expanded)
     return None
 
 
+@lru_cache(maxsize=1)
 def build_proxy_settings() -> Tuple[Dict[str, str], Optional[GenericProxyConfig]]:
     http_proxy = os.environ.get("YOUTUBE_PROXY_HTTP") or os.environ.get("YOUTUBE_PROXY")
     https_proxy = os.environ.get("YOUTUBE_PROXY_HTTPS") or os.environ.get("YOUTUBE_PROXY")
@@ -84,29 +160,112 @@ def build_proxy_settings() -> Tuple[Dict[str, str], Optional[GenericProxyConfig]
         }
         return proxy_dict, proxy_config
     except InvalidProxyConfig as e:
-        print(f"Invalid proxy configuration: {e}")
+        logger.warning("Invalid proxy configuration: %s", e)
         return {}, None
 
 
+def clear_settings_cache() -> None:
+    resolve_cookie_path.cache_clear()
+    build_proxy_settings.cache_clear()
+    # Pooled sessions carry the old proxies and cookies; close them so their
+    # connection pools are released and the next call builds fresh ones.
+    with _sessions_lock:
+        stale_sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in stale_sessions:
+        session.close()
+
+
+_cookie_jars: Dict[Tuple[str, Optional[float]], MozillaCookieJar] = {}
+_cookie_jars_lock = threading.Lock()
+
+
+def _cookie_mtime(cookies_path: Optional[str]) -> Optional[float]:
+    if not cookies_path:
+        return None
+    try:
+        return os.path.getmtime(cookies_path)
+    except OSError:
+        return None
+
+
+def load_cookie_jar(cookies_path: str) -> MozillaCookieJar:
+    """Return a private copy of the cookies in a cookies.txt file.
+
+    The file is parsed once per modification time; each caller gets its own jar
+    so Set-Cookie responses on one session don't leak into the others.
+    """
+    key = (cookies_path, _cookie_mtime(cookies_path))
+    with _cookie_jars_lock:
+        parsed = _cookie_jars.get(key)
+        if parsed is None:
+            parsed = MozillaCookieJar()
+            parsed.load(cookies_path, ignore_discard=True, ignore_expires=True)
+            for stale in [k for k in _cookie_jars if k[0] == cookies_path]:
+                del _cookie_jars[stale]
+            _cookie_jars[key] = parsed
+            logger.info("Loaded cookies from %s", cookies_path)
+        cookie_jar = MozillaCookieJar(cookies_path)
+        for cookie in parsed:
+            cookie_jar.set_cookie(copy.copy(cookie))
+    return cookie_jar
+
+
 def create_http_session(proxy_dict: Dict[str, str], cookies_path: Optional[str]) -> requests.Session:
     session = requests.Session()
     session.headers.update({"User-Agent": DEFAULT_USER_AGENT, "Accept-Language": "en-US,en;q=0.9"})
 
+    # Pool keep-alive connections and retry transient server errors. 429 is left to
+    # the callers, which treat it as a rate-limit signal rather than something to retry.
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
     if proxy_dict:
         session.proxies.update(proxy_dict)
 
     if cookies_path:
         try:
-            cookie_jar = MozillaCookieJar()
-            cookie_jar.load(cookies_path, ignore_discard=True, ignore_expires=True)
-            session.cookies = cookie_jar
-            print(f"Loaded cookies from {cookies_path}")
+            session.cookies = load_cookie_jar(cookies_path)
         except Exception as e:
-            print(f"Failed to load cookies from {cookies_path}: {e}")
+            logger.warning("Failed to load cookies from %s: %s", cookies_path, e)
 
     return session
 
 
+_sessions: Dict[Tuple, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_http_session(proxy_dict: Dict[str, str], cookies_path: Optional[str]) -> requests.Session:
+    """Return the process-wide session for this proxy/cookie configuration.
+
+    Sessions are reused across calls so caption fetches keep their TCP/TLS
+    connections to YouTube alive instead of reconnecting every time.
+    """
+    # The cookie file's mtime is part of the key, so an updated cookies.txt (as the
+    # IP-block error asks for) is picked up on the next request; one stat is
+    # negligible next to the network calls that follow.
+    key = (tuple(sorted(proxy_dict.items())), cookies_path, _cookie_mtime(cookies_path))
+    stale_sessions = []
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            for stale in [k for k in _sessions if k[:2] == key[:2]]:
+                stale_sessions.append(_sessions.pop(stale))
+            session = _sessions[key] = create_http_session(proxy_dict, cookies_path)
+    for stale_session in stale_sessions:
+        stale_session.close()
+    return session
+
+
 def update_metadata_from_info(info: Dict, metadata: Dict[str, Optional[str]]) -> None:
     if not info:
         return
@@ -130,6 +289,12 @@ def fetch_video_metadata(
     cookies_path: Optional[str],
     proxy_dict: Dict[str, str],
 ) -> Optional[Dict]:
+    video_id = extract_video_id(video_url)
+    if CACHE_ENABLED and video_id:
+        cached = _cache_get(("meta", video_id))
+        if cached is not None:
+            return cached
+
     ydl_opts = {
         'skip_download': True,
         'quiet': True,
@@ -146,16 +311,98 @@ def fetch_video_metadata(
 
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         try:
-            return ydl.extract_info(video_url, download=False)
+            info = ydl.extract_info(video_url, download=False)
         except Exception as e:
-            print(f"Failed to fetch video metadata via yt-dlp: {e}")
+            logger.warning("Failed to fetch video metadata via yt-dlp: %s", e)
             return None
 
+    if CACHE_ENABLED and video_id and info:
+        # Only keep the fields update_metadata_from_info() reads; full info dicts are large.
+        trimmed = {key: info.get(key) for key in METADATA_CACHE_FIELDS}
+        _cache_set(("meta", video_id), trimmed, expire=METADATA_CACHE_TTL)
+    return info
 
-def get_transcript(video_url):
+
+def _ensure_metadata(
+    metadata: Dict[str, Optional[str]],
+    cached_info: Optional[Dict],
+    video_url: str,
+    session: requests.Session,
+    cookies_path: Optional[str],
+    proxy_dict: Dict[str, str],
+) -> None:
+    """Fill missing metadata, reusing info already extracted during this call when available."""
+    if metadata.get("title") is not None:
+        return
+    info = cached_info or fetch_video_metadata(video_url, session, cookies_path, proxy_dict)
+    if info:
+        update_metadata_from_info(info, metadata)
+
+
+def get_cached_transcript(video_url: str) -> Optional[Tuple[str, Dict[str, Optional[str]]]]:
+    """Return the cached ``(transcript, metadata)`` for a video, or None."""
+    if not CACHE_ENABLED:
+        return None
+    video_id = extract_video_id(video_url)
+    if not video_id:
+        return None
+    cached = _cache_get(("transcript", video_id))
+    if cached is None:
+        return None
+    return cached["transcript"], cached["metadata"]
+
+
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def get_transcript(video_url, use_cache=True):
     """
     Retrieves the transcript for a given YouTube video URL.
+
+    Successful results are cached per video id; pass use_cache=False to refetch.
+    Concurrent calls for the same video share a single fetch.
     """
+    if use_cache:
+        cached = get_cached_transcript(video_url)
+        if cached is not None:
+            logger.info("Transcript served from cache")
+            return cached
+
+    video_id = extract_video_id(video_url)
+    if not video_id:
+        return _fetch_transcript(video_url)
+
+    with _inflight_lock:
+        future = _inflight.get(video_id)
+        owner = future is None
+        if owner:
+            future = _inflight[video_id] = Future()
+    if not owner:
+        logger.info("Waiting for the in-flight transcript fetch of %s", video_id)
+        transcript, metadata = future.result()
+        # Callers may fill in metadata; don't share one dict between them.
+        return transcript, dict(metadata)
+
+    try:
+        transcript, metadata = _fetch_transcript(video_url)
+        if CACHE_ENABLED and not transcript.startswith("Error:"):
+            _cache_set(
+                ("transcript", video_id),
+                {"transcript": transcript, "metadata": metadata},
+                expire=TRANSCRIPT_CACHE_TTL,
+            )
+        future.set_result((transcript, dict(metadata)))
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[video_id]
+    return transcript, metadata
+
+
+def _fetch_transcript(video_url):
     metadata = {
         "title": None,
         "channel": None,
@@ -165,80 +412,87 @@ def get_transcript(video_url):
     }
 
     if not is_valid_youtube_url(video_url):
-        print(f"Invalid YouTube URL: {video_url}")
+        logger.info("Invalid YouTube URL: %s", video_url)
         return "Error: Invalid YouTube URL", metadata
 
     cookies_path = resolve_cookie_path()
     proxy_dict, proxy_config = build_proxy_settings()
-    session = create_http_session(proxy_dict, cookies_path)
+    session = get_http_session(proxy_dict, cookies_path)
 
     rate_limited = False
     ip_blocked = False
+    cached_info = None
+    video_id = extract_video_id(video_url)
 
-    try:
+    if video_id:
+        try:
+            logger.info("Step: Attempting to fetch transcript via InnerTube player captions")
+            transcript_text, rate_limited, cached_info = get_transcript_via_innertube(video_id, session)
+            if transcript_text:
+                update_metadata_from_info(cached_info, metadata)
+                logger.info("Transcript fetched via InnerTube player captions")
+                return transcript_text.strip(), metadata
+        except Exception as e:
+            logger.warning("InnerTube captions error: %s. Falling back to yt-dlp.", e)
+
+    if not rate_limited:
         try:
-            print("Step: Attempting to fetch transcript via yt-dlp auto-captions")
-            transcript_text, rate_limited = get_transcript_via_yt_dlp(
+            logger.info("Step: Attempting to fetch transcript via yt-dlp auto-captions")
+            transcript_text, rate_limited, info = get_transcript_via_yt_dlp(
                 video_url, session, cookies_path, proxy_dict, metadata
             )
+            cached_info = info or cached_info
             if transcript_text and transcript_text.strip():
                 if is_suspect_content(transcript_text):
-                    print("Transcript appears to be an error page; ignoring yt-dlp result.")
+                    logger.warning("Transcript appears to be an error page; ignoring yt-dlp result.")
                 else:
-                    print("Transcript fetched via yt-dlp auto-captions")
+                    logger.info("Transcript fetched via yt-dlp auto-captions")
                     return transcript_text.strip(), metadata
         except Exception as e:
-            print(f"yt-dlp auto-captions error: {e}. Will try other methods.")
-
-        try:
-            video_id = extract_video_id(video_url)
-            if video_id:
-                print("Step: Attempting to fetch transcript via YouTube Transcript API")
-                transcript_text = fetch_transcript_via_api(video_id, proxy_config, session)
-                if transcript_text:
-                    if is_suspect_content(transcript_text):
-                        print("YouTube Transcript API returned suspicious content; ignoring.")
-                    else:
-                        print("Transcript fetched from YouTube Transcript API")
-                        if metadata.get("title") is None:
-                            info = fetch_video_metadata(video_url, session, cookies_path, proxy_dict)
-                            if info:
-                                update_metadata_from_info(info, metadata)
-                        return transcript_text.strip(), metadata
-        except (TranscriptsDisabled, NoTranscriptFound) as e:
-            print(f"YouTube Transcript API unavailable for this video: {e}.")
-        except IpBlocked:
-            print("YouTube Transcript API reports IP blocked.")
-            ip_blocked = True
-        except RequestBlocked:
-            print("YouTube Transcript API reports request blocked (possible consent screen).")
-            ip_blocked = True
-        except Exception as e:
-            print(f"YouTube Transcript API error: {e}.")
-
-        if rate_limited:
-            if metadata.get("title") is None:
-                info = fetch_video_metadata(video_url, session, cookies_path, proxy_dict)
-                if info:
-                    update_metadata_from_info(info, metadata)
-            return RATE_LIMIT_ERROR, metadata
-        if ip_blocked:
-            if metadata.get("title") is None:
-                info = fetch_video_metadata(video_url, session, cookies_path, proxy_dict)
-                if info:
-                    update_metadata_from_info(info, metadata)
-            return IP_BLOCKED_ERROR, metadata
-
-        if metadata.get("title") is None:
-            info = fetch_video_metadata(video_url, session, cookies_path, proxy_dict)
-            if info:
-                update_metadata_from_info(info, metadata)
-
-        return "Error: No captions available for this video", metadata
-    finally:
-        session.close()
-
+            logger.warning("yt-dlp auto-captions error: %s. Will try other methods.", e)
 
+    try:
+        if video_id:
+            logger.info("Step: Attempting to fetch transcript via YouTube Transcript API")
+            # YouTubeTranscriptApi reconfigures the session it is given (headers, proxies,
+            # adapters that retry 429s) and isn't thread-safe, so it gets a private one
+            # rather than the shared pooled session.
+            api_session = create_http_session(proxy_dict, cookies_path)
+            try:
+                transcript_text = fetch_transcript_via_api(video_id, proxy_config, api_session)
+            finally:
+                api_session.close()
+            if transcript_text:
+                if is_suspect_content(transcript_text):
+                    logger.warning("YouTube Transcript API returned suspicious content; ignoring.")
+                else:
+                    logger.info("Transcript fetched from YouTube Transcript API")
+                    _ensure_metadata(metadata, cached_info, video_url, session, cookies_path, proxy_dict)
+                    return transcript_text.strip(), metadata
+    except (TranscriptsDisabled, NoTranscriptFound) as e:
+        logger.info("YouTube Transcript API unavailable for this video: %s.", e)
+    except IpBlocked:
+        logger.warning("YouTube Transcript API reports IP blocked.")
+        ip_blocked = True
+    except RequestBlocked:
+        logger.warning("YouTube Transcript API reports request blocked (possible consent screen).")
+        ip_blocked = True
+    except Exception as e:
+        logger.warning("YouTube Transcript API error: %s.", e)
+
+    if rate_limited:
+        _ensure_metadata(metadata, cached_info, video_url, session, cookies_path, proxy_dict)
+        return RATE_LIMIT_ERROR, metadata
+    if ip_blocked:
+        _ensure_metadata(metadata, cached_info, video_url, session, cookies_path, proxy_dict)
+        return IP_BLOCKED_ERROR, metadata
+
+    _ensure_metadata(metadata, cached_info, video_url, session, cookies_path, proxy_dict)
+
+    return "Error: No captions available for this video", metadata
+
+
+@lru_cache(maxsize=256)
 def extract_video_id(url: str) -> str:
     """Extracts the YouTube video ID from a URL."""
     try:
@@ -259,20 +513,232 @@ def extract_video_id(url: str) -> str:
         return ""
 
 
+def caption_track_urls(tracks_by_lang: Dict) -> List[str]:
+    """Collect the English caption track URLs yt-dlp reported, in preference order.
+
+    The order is what decides the result: fetch_first_caption only accepts a track
+    once every earlier one has failed.
+    """
+    candidates = [
+        track
+        for lang in CAPTION_LANGS
+        for track in tracks_by_lang.get(lang, ())
+        if track.get('ext') in _EXT_PRIORITY and track.get('url')
+    ]
+    # Stable sort: preferred format first, language order kept within a format.
+    candidates.sort(key=lambda track: _EXT_PRIORITY[track['ext']])
+    return [track['url'] for track in candidates]
+
+
+class CaptionRateLimited(Exception):
+    """YouTube is throttling caption downloads for longer than we are willing to wait."""
+
+
+_caption_slots = threading.Semaphore(CAPTION_MAX_CONCURRENCY)
+_throttle_lock = threading.Lock()
+_next_allowed_at = 0.0
+_caption_backoff = CAPTION_BACKOFF_START
+
+
+def _caption_cooldown_remaining() -> float:
+    with _throttle_lock:
+        return max(0.0, _next_allowed_at - time.monotonic())
+
+
+def _record_caption_response(response: requests.Response) -> None:
+    """Reset the backoff after a good response, or start a cool-down after a 429."""
+    global _next_allowed_at, _caption_backoff
+    with _throttle_lock:
+        if response.status_code != 429:
+            _caption_backoff = CAPTION_BACKOFF_START
+            return
+        retry_after = response.headers.get("Retry-After", "").strip()
+        delay = int(retry_after) if retry_after.isdigit() else _caption_backoff
+        delay = min(delay, CAPTION_BACKOFF_MAX)
+        _caption_backoff = min(_caption_backoff * 2, CAPTION_BACKOFF_MAX)
+        _next_allowed_at = max(_next_allowed_at, time.monotonic() + delay)
+
+
+def _throttled_request(session: requests.Session, method: str, url: str, **kwargs) -> requests.Response:
+    for _ in range(CAPTION_429_RETRIES + 1):
+        wait = _caption_cooldown_remaining()
+        if wait > CAPTION_MAX_WAIT:
+            raise CaptionRateLimited(f"YouTube requests are cooling down for {wait:.0f}s")
+        if wait:
+            time.sleep(wait)
+        response = session.request(method, url, **kwargs)
+        _record_caption_response(response)
+        if response.status_code != 429:
+            return response
+        response.close()
+    raise CaptionRateLimited("YouTube kept answering 429")
+
+
+def _download_caption(session: requests.Session, url: str, stop: threading.Event) -> str:
+    logger.debug("Trying caption URL: %.100s...", url)
+    with _caption_slots:
+        # Another track may have been accepted while this one waited for a slot.
+        if stop.is_set():
+            return ""
+        with _throttled_request(session, "GET", url, timeout=15, stream=True) as response:
+            response.raise_for_status()
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(CAPTION_CHUNK_BYTES):
+                if stop.is_set():
+                    # Release the connection and the slot for other videos.
+                    return ""
+                if not chunks and chunk.lstrip(b'\xef\xbb\xbf').startswith(b'#EXTM3U'):
+                    # An HLS playlist rather than captions; don't download the rest.
+                    return ""
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_CAPTION_BYTES:
+                    logger.warning("Caption file exceeds %d bytes; truncating.", MAX_CAPTION_BYTES)
+                    break
+    # WebVTT and YouTube srv tracks are UTF-8 regardless of the Content-Type charset.
+    text = b"".join(chunks).decode("utf-8", errors="ignore")
+    if not text:
+        return ""
+    cleaned = vtt_to_text(text)
+    if cleaned and not is_suspect_content(cleaned):
+        return cleaned
+    return ""
+
+
+def _caption_result(future: Future, label: str) -> str:
+    """The transcript a finished download produced, or "" if it failed or looked invalid."""
+    try:
+        text = future.result()
+    except CaptionRateLimited:
+        raise
+    except requests.HTTPError as e:
+        logger.debug("HTTP error fetching %s: %s", label, e)
+        return ""
+    except Exception as e:
+        logger.debug("Error fetching %s: %s", label, e)
+        return ""
+    if not text:
+        logger.debug("%s content looked invalid; trying next track.", label.capitalize())
+    return text
+
+
+def fetch_first_caption(session: requests.Session, urls: List[str], label: str) -> Tuple[str, bool]:
+    """Download candidate caption URLs concurrently and return the best valid transcript
+    as (text, rate_limited flag).
+
+    Candidates are accepted strictly in list order: a track only wins once every
+    earlier one has finished without a usable transcript, however fast it downloaded.
+    Once a track is accepted the remaining downloads stop. Persistent 429s on any
+    track stop the rest.
+    """
+    if not urls:
+        return "", False
+
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=min(CAPTION_FETCH_WORKERS, len(urls)))
+    futures = [executor.submit(_download_caption, session, url, stop) for url in urls]
+    next_index = 0
+    try:
+        for finished in as_completed(futures):
+            error = finished.exception()
+            if isinstance(error, CaptionRateLimited):
+                raise error
+            while next_index < len(futures) and futures[next_index].done():
+                text = _caption_result(futures[next_index], label)
+                if text:
+                    return text, False
+                next_index += 1
+        return "", False
+    except CaptionRateLimited as e:
+        logger.warning("Rate-limited while fetching %ss (%s); stopping attempts.", label, e)
+        return "", True
+    finally:
+        stop.set()
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def fetch_player_response(video_id: str, session: requests.Session) -> Dict:
+    """POST to YouTube's InnerTube player endpoint and return the decoded player response."""
+    payload = {"context": {"client": INNERTUBE_CLIENT}, "videoId": video_id}
+    with _caption_slots:
+        response = _throttled_request(session, "POST", INNERTUBE_PLAYER_URL, json=payload, timeout=15)
+    response.raise_for_status()
+    # Player responses run to a few hundred KB; orjson decodes them much faster than json.
+    return orjson.loads(response.content)
+
+
+def player_response_info(player: Dict) -> Optional[Dict]:
+    """Map the player response's videoDetails onto the yt-dlp info fields we use."""
+    details = player.get("videoDetails")
+    if not details:
+        return None
+    length = details.get("lengthSeconds")
+    return {
+        "webpage_url": f"https://www.youtube.com/watch?v={details.get('videoId')}",
+        "title": details.get("title"),
+        "uploader": details.get("author"),
+        "duration": int(length) if str(length).isdigit() else None,
+    }
+
+
+def player_caption_urls(player: Dict) -> List[str]:
+    """English caption track URLs from a player response, as VTT, in CAPTION_LANGS order."""
+    tracks = (
+        player.get("captions", {})
+        .get("playerCaptionsTracklistRenderer", {})
+        .get("captionTracks", [])
+    )
+    return [
+        track["baseUrl"] + "&fmt=vtt"
+        for lang in CAPTION_LANGS
+        for track in tracks
+        if track.get("languageCode") == lang and track.get("baseUrl")
+    ]
+
+
+def get_transcript_via_innertube(
+    video_id: str,
+    session: requests.Session,
+) -> Tuple[str, bool, Optional[Dict]]:
+    """Fetch captions straight from the InnerTube player response, skipping yt-dlp's
+    extractor. Returns (text, rate_limited flag, info) like get_transcript_via_yt_dlp."""
+    try:
+        player = fetch_player_response(video_id, session)
+    except CaptionRateLimited as e:
+        logger.warning("Rate-limited fetching the player response (%s).", e)
+        return "", True, None
+
+    info = player_response_info(player)
+    status = player.get("playabilityStatus", {}).get("status")
+    if status != "OK":
+        logger.debug("InnerTube playability status is %s", status)
+    urls = player_caption_urls(player)
+    logger.debug("InnerTube caption tracks available: %d", len(urls))
+    text, rate_limited = fetch_first_caption(session, urls, "InnerTube caption")
+    return text, rate_limited, info
+
+
 def get_transcript_via_yt_dlp(
     video_url: str,
     session: requests.Session,
     cookies_path: Optional[str],
     proxy_dict: Dict[str, str],
     metadata: Dict[str, Optional[str]],
-) -> Tuple[str, bool]:
-    """Fetch auto-generated captions via yt-dlp and return (text, rate_limited flag)."""
+) -> Tuple[str, bool, Optional[Dict]]:
+    """Fetch auto-generated captions via yt-dlp and return (text, rate_limited flag, info).
+
+    info is the extracted video info (None if extraction failed) so callers can
+    reuse it for metadata instead of extracting it a second time.
+    """
     ydl_opts = {
         'skip_download': True,
         'quiet': True,
         'writesubtitles': True,
         'writeautomaticsub': True,
-        'subtitleslangs': ['en', 'en-US', 'en-GB'],
+        'subtitleslangs': list(CAPTION_LANGS),
         'subtitlesformat': 'vtt',
         'extract_flat': False,
         'http_headers': {
@@ -286,96 +752,44 @@ def get_transcript_via_yt_dlp(
         ydl_opts['proxy'] = proxy_dict.get('https') or proxy_dict.get('http')
 
     rate_limited = False
+    info = None
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = None
         try:
             info = ydl.extract_info(video_url, download=False)
-            print(f"Video title: {info.get('title', 'Unknown')}")
+            logger.info("Video title: %s", info.get('title', 'Unknown'))
             update_metadata_from_info(info, metadata)
             
-            # Try automatic captions first
+            # Try automatic captions first, then manual subtitles
             auto_captions = info.get('automatic_captions', {})
-            print(f"Auto captions available: {list(auto_captions.keys())}")
-            
-            for lang in ['en', 'en-US', 'en-GB']:
-                if lang in auto_captions:
-                    for track in auto_captions[lang]:
-                        if track.get('ext') in ['vtt', 'srv1', 'srv2', 'srv3']:
-                            url = track.get('url')
-                            if not url:
-                                continue
-                            try:
-                                print(f"Trying auto-caption URL: {url[:100]}...")
-                                response = session.get(url, timeout=15)
-                                response.raise_for_status()
-                                text = response.text
-                                if not text or text.startswith('#EXTM3U'):
-                                    continue
-                                cleaned = vtt_to_text(text)
-                                if cleaned and not is_suspect_content(cleaned):
-                                    return cleaned, rate_limited
-                                print("Auto-caption content looked invalid; trying next track.")
-                            except requests.HTTPError as e:
-                                if e.response is not None and e.response.status_code == 429:
-                                    rate_limited = True
-                                    print("Received 429 while fetching auto-captions; stopping attempts.")
-                                    return "", rate_limited
-                                print(f"HTTP error fetching auto-caption: {e}")
-                                continue
-                            except Exception as e:
-                                print(f"Error fetching auto-caption: {e}")
-                                continue
-            
-            # Try manual subtitles if auto-captions failed
+            logger.debug("Auto captions available: %s", list(auto_captions))
+            text, rate_limited = fetch_first_caption(
+                session, caption_track_urls(auto_captions), "auto-caption"
+            )
+            if text or rate_limited:
+                return text, rate_limited, info
+
             subtitles = info.get('subtitles', {})
-            print(f"Manual subtitles available: {list(subtitles.keys())}")
-            
-            for lang in ['en', 'en-US', 'en-GB']:
-                if lang in subtitles:
-                    for track in subtitles[lang]:
-                        if track.get('ext') in ['vtt', 'srv1', 'srv2', 'srv3']:
-                            url = track.get('url')
-                            if not url:
-                                continue
-                            try:
-                                print(f"Trying subtitle URL: {url[:100]}...")
-                                response = session.get(url, timeout=15)
-                                response.raise_for_status()
-                                text = response.text
-                                if not text or text.startswith('#EXTM3U'):
-                                    continue
-                                cleaned = vtt_to_text(text)
-                                if cleaned and not is_suspect_content(cleaned):
-                                    return cleaned, rate_limited
-                                print("Subtitle content looked invalid; trying next track.")
-                            except requests.HTTPError as e:
-                                if e.response is not None and e.response.status_code == 429:
-                                    rate_limited = True
-                                    print("Received 429 while fetching subtitles; stopping attempts.")
-                                    return "", rate_limited
-                                print(f"HTTP error fetching subtitle: {e}")
-                                continue
-                            except Exception as e:
-                                print(f"Error fetching subtitle: {e}")
-                                continue
+            logger.debug("Manual subtitles available: %s", list(subtitles))
+            text, rate_limited = fetch_first_caption(
+                session, caption_track_urls(subtitles), "subtitle"
+            )
+            if text or rate_limited:
+                return text, rate_limited, info
         except Exception as e:
-            print(f"Error extracting video info: {e}")
-    return "", rate_limited
+            logger.warning("Error extracting video info: %s", e)
+    return "", rate_limited, info
 
 
 def vtt_to_text(vtt: str) -> str:
-    lines = []
-    for line in vtt.splitlines():
-        line = re.sub(r'<[^>]+>', '', line).strip()
-        if not line:
-            continue
-        if line.startswith('WEBVTT'):
-            continue
-        if '-->' in line:
-            continue
-        if re.match(r'^\d+$', line):
-            continue
-        lines.append(line)
+    # Strip inline tags in one pass over the whole file rather than line by line.
+    stripped = _VTT_TAG_RE.sub('', vtt)
+    lines = [
+        line for line in map(str.strip, stripped.splitlines())
+        if line
+        and not line.startswith('WEBVTT')
+        and '-->' not in line
+        and not line.isdigit()
+    ]
     return " ".join(lines)
 
 
@@ -400,9 +814,9 @@ def fetch_transcript_via_api(
             try:
                 return YouTubeTranscriptApi(**params)
             except Exception as e:
-                print(f"Failed to initialize YouTubeTranscriptApi with provided params: {e}")
+                logger.warning("Failed to initialize YouTubeTranscriptApi with provided params: %s", e)
         except Exception as e:
-            print(f"Failed to initialize YouTubeTranscriptApi: {e}")
+            logger.warning("Failed to initialize YouTubeTranscriptApi: %s", e)
         return None
 
     api_instance = build_api_instance()
@@ -415,7 +829,7 @@ def fetch_transcript_via_api(
 
         list_method = getattr(api_instance, "list", None)
         if callable(list_method):
-            print("Using YouTubeTranscriptApi.list fallback to retrieve transcript.")
+            logger.debug("Using YouTubeTranscriptApi.list fallback to retrieve transcript.")
             transcripts = list_method(video_id)
             transcript = transcripts.find_transcript(['en'])
             entries = transcript.fetch()
@@ -429,11 +843,11 @@ def fetch_transcript_via_api(
 
     list_method = getattr(YouTubeTranscriptApi, "list_transcripts", None)
     if callable(list_method):
-        print("youtube_transcript_api.get_transcript unavailable; using list_transcripts fallback.")
+        logger.debug("youtube_transcript_api.get_transcript unavailable; using list_transcripts fallback.")
         transcripts = list_method(video_id)
         transcript = transcripts.find_transcript(['en'])
         entries = transcript.fetch()
         return " ".join(chunk.get('text', '') for chunk in entries).strip()
 
-    print("youtube_transcript_api lacks supported transcript retrieval methods; cannot fetch.")
+    logger.warning("youtube_transcript_api lacks supported transcript retrieval methods; cannot fetch.")
     return ""